@@ -0,0 +1,56 @@
+"""
+Equity-curve risk kernels used by RiskAgent.
+The numba kernel walks the curve once for max drawdown and collects returns
+for historical VaR; the NumPy version is used when numba is unavailable.
+"""
+import numpy as np
+from src.utils.jit import njit, HAS_NUMBA
+
+@njit(cache=True, fastmath=True)
+def _drawdown_var_kernel(ec, q):
+    """(max drawdown, historical VaR at quantile q) of an equity curve, both as positive fractions."""
+    n = ec.shape[0]
+    if n < 2:
+        return 0.0, 0.0
+
+    peak = ec[0]
+    max_dd = 0.0
+    returns = np.empty(n - 1)
+    m = 0
+    for i in range(n):
+        if ec[i] > peak:
+            peak = ec[i]
+        if peak > 0:
+            dd = 1.0 - ec[i] / peak
+            if dd > max_dd:
+                max_dd = dd
+        if i > 0 and ec[i - 1] > 0:
+            returns[m] = ec[i] / ec[i - 1] - 1.0
+            m += 1
+
+    if m == 0:
+        return max_dd, 0.0
+    var = -np.quantile(returns[:m], q)
+    return max_dd, max(0.0, var)
+
+def _drawdown_var_numpy(ec, q):
+    """NumPy equivalent of _drawdown_var_kernel."""
+    if ec.shape[0] < 2:
+        return 0.0, 0.0
+
+    peaks = np.maximum.accumulate(ec)
+    max_dd = float(np.max(np.where(peaks > 0, 1.0 - ec / np.where(peaks > 0, peaks, 1.0), 0.0)))
+
+    prev = ec[:-1]
+    ok = prev > 0
+    returns = ec[1:][ok] / prev[ok] - 1.0
+    if returns.size == 0:
+        return max_dd, 0.0
+    return max_dd, max(0.0, -float(np.quantile(returns, q)))
+
+rolling_drawdown_var = _drawdown_var_kernel if HAS_NUMBA else _drawdown_var_numpy
+
+def warmup():
+    """Compile (or load from cache) the kernels so the first cycle doesn't pay JIT latency."""
+    if HAS_NUMBA:
+        _drawdown_var_kernel(np.ones(3), 0.05)
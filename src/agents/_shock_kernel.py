@@ -0,0 +1,35 @@
+"""
+Scenario PnL kernels used by ScenarioAgent.simulate_shocks_batch.
+The numba kernel fuses the whole per-scenario expression into one pass with
+no (K, N) temporaries; the NumPy version is used when numba is unavailable.
+"""
+import numpy as np
+from src.utils.jit import njit, prange, HAS_NUMBA
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _impacts_kernel(sizes, entries, marks, upnls, signs, shocks):
+    """(K,) pnl impacts for a (K, N) shock matrix; scenarios run in parallel."""
+    K = shocks.shape[0]
+    out = np.empty(K)
+    for k in prange(K):
+        s = 0.0
+        for i in range(sizes.shape[0]):
+            shock = shocks[k, i]
+            if shock != 0.0: # Unshocked positions keep their current PnL
+                s += signs[i] * (marks[i] * (1.0 + shock) - entries[i]) * sizes[i] - upnls[i]
+        out[k] = s
+    return out
+
+def _impacts_numpy(sizes, entries, marks, upnls, signs, shocks):
+    """NumPy equivalent of _impacts_kernel."""
+    new_marks = marks * (1 + shocks)
+    pnl_changes = signs * (new_marks - entries) * sizes - upnls
+    return np.where(shocks != 0.0, pnl_changes, 0.0).sum(axis=1)
+
+simulate_impacts = _impacts_kernel if HAS_NUMBA else _impacts_numpy
+
+def warmup():
+    """Compile (or load from cache) _impacts_kernel for the dtypes simulate_shocks_batch passes."""
+    if HAS_NUMBA:
+        _impacts_kernel(np.ones(2), np.ones(2), np.ones(2), np.zeros(2),
+                        np.ones(2, dtype=np.int8), np.zeros((1, 2)))
@@ -1,4 +1,6 @@
 import logging
+import numpy as np
+import pandas as pd
 from typing import Dict, Any, Optional
 from src.models.schema import PortfolioSnapshot
 from src.core.logger import logger
@@ -16,25 +18,20 @@ class AttributionAgent:
         if not previous:
             return {"message": "No previous snapshot for attribution"}
             
-        total_pnl_change = current.total_unrealized_pnl_usd - previous.total_unrealized_pnl_usd
+        curr_f = current.frame
+        prev_f = previous.frame
         
-        curr_pos_map = {p.symbol: p for p in current.positions}
-        prev_pos_map = {p.symbol: p for p in previous.positions}
+        # Current PnL counts positive, previous negative; summing per symbol gives the change
+        symbols = np.concatenate([curr_f.symbols, prev_f.symbols])
+        signed_pnl = np.concatenate([curr_f.unrealized_pnl, -prev_f.unrealized_pnl])
         
-        breakdown = {}
+        codes, uniques = pd.factorize(symbols)
+        changes = np.bincount(codes, weights=signed_pnl, minlength=len(uniques))
         
-        all_symbols = set(curr_pos_map.keys()) | set(prev_pos_map.keys())
+        total_pnl_change = float(changes.sum())
         
-        for sym in all_symbols:
-            curr_p = curr_pos_map.get(sym)
-            prev_p = prev_pos_map.get(sym)
-            
-            curr_val = curr_p.unrealized_pnl if curr_p else 0.0
-            prev_val = prev_p.unrealized_pnl if prev_p else 0.0
-            
-            change = curr_val - prev_val
-            if abs(change) > 0.01: # Filter noise
-                breakdown[sym] = change
+        mask = np.abs(changes) > 0.01 # Filter noise
+        breakdown = dict(zip(uniques[mask].tolist(), changes[mask].tolist()))
                 
         logger.info(f"Attribution: Total Change=${total_pnl_change:.2f}")
         
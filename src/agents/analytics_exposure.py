@@ -1,8 +1,50 @@
 import logging
 import asyncio
-from typing import Dict, Any, Tuple
+import numpy as np
+from typing import Dict, Any
 from src.models.schema import PortfolioSnapshot
 from src.core.logger import logger
+from src.utils.jit import njit, HAS_NUMBA
+
+@njit(cache=True, fastmath=True)
+def _exposure_kernel(sizes, prices, signs, codes, n_codes):
+    """Single fused pass: gross, net and per-symbol notional, then HHI."""
+    gross = 0.0
+    net = 0.0
+    per_code = np.zeros(n_codes)
+    for i in range(sizes.shape[0]):
+        notional = sizes[i] * prices[i]
+        gross += notional
+        net += signs[i] * notional
+        per_code[codes[i]] += notional
+        
+    hhi = 0.0
+    if gross > 0:
+        for j in range(n_codes):
+            w = per_code[j] / gross
+            hhi += w * w
+    return gross, net, hhi
+
+def _exposure_numpy(sizes, prices, signs, codes, n_codes):
+    """NumPy equivalent of _exposure_kernel, used when numba is unavailable."""
+    notionals = sizes * prices
+    gross = notionals.sum()
+    net = np.vdot(notionals, signs)
+    
+    hhi = 0.0
+    if gross > 0:
+        # Notional per symbol, then sum of squared weights
+        per_code = np.bincount(codes, weights=notionals, minlength=n_codes)
+        hhi = np.sum((per_code / gross) ** 2)
+    return gross, net, hhi
+
+_compute_exposure = _exposure_kernel if HAS_NUMBA else _exposure_numpy
+
+def warmup():
+    """Compile (or load from cache) _exposure_kernel for the dtypes PositionsFrame produces."""
+    if HAS_NUMBA:
+        _exposure_kernel(np.ones(2), np.ones(2), np.ones(2, dtype=np.int8),
+                         np.zeros(2, dtype=np.intp), 1)
 
 class ExposureAgent:
     def __init__(self):
@@ -20,32 +62,11 @@ class ExposureAgent:
                 "concentration_hhi": 0.0
             }
 
-        total_equity = snapshot.total_equity_usd
-        
-        gross_exposure = 0.0
-        net_exposure = 0.0
-        
-        asset_weights = {}
-        total_notional = 0.0
-        
-        for pos in snapshot.positions:
-            notional = pos.size * pos.mark_price
-            gross_exposure += notional
-            
-            if pos.side.lower() == 'long':
-                net_exposure += notional
-            else:
-                net_exposure -= notional
-                
-            sym = pos.symbol
-            asset_weights[sym] = asset_weights.get(sym, 0.0) + notional
-            total_notional += notional
-            
-        hhi = 0.0
-        if total_notional > 0:
-            for val in asset_weights.values():
-                weight = val / total_notional
-                hhi += weight ** 2
+        f = snapshot.frame
+        gross, net, hhi = _compute_exposure(f.sizes, f.mark_prices, f.sides, f.symbol_codes, len(f.unique_symbols))
+        gross_exposure = float(gross)
+        net_exposure = float(net)
+        hhi = float(hhi)
         
         logger.info(f"Computed Exposure: Gross=${gross_exposure:.2f}, Net=${net_exposure:.2f}, HHI={hhi:.4f}")
         
@@ -1,41 +1,130 @@
 import logging
+import time
 import numpy as np
-import pandas as pd
 import duckdb
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Optional, Sequence
 from datetime import datetime, timedelta
-from src.models.schema import PortfolioSnapshot, init_duckdb
+from src.models.schema import PortfolioSnapshot, init_duckdb, normalize_symbol
+from src.core import duck
+from src.agents._risk_kernels import rolling_drawdown_var
 from src.core.logger import logger
 
+VOL_CACHE_TTL_SECONDS = 60.0
+MIN_VOL_TICKS = 10
+HOURS_PER_YEAR = 24 * 365
+EQUITY_WINDOW = 4096 # Equity observations kept for drawdown (~68h at one cycle per minute)
+
+# Last tick per hourly bucket over the last 24h, per normalized symbol.
+# Only this small hourly series leaves DuckDB.
+_HOURLY_CLOSE_SQL = """
+    SELECT symbol_norm,
+           time_bucket(INTERVAL '1 hour', timestamp) AS h,
+           arg_max(last, timestamp) AS close,
+           count(*) AS n_ticks
+    FROM market_ticks
+    WHERE symbol_norm IN ({placeholders})
+    AND timestamp > now() - INTERVAL '1 day'
+    GROUP BY symbol_norm, h
+    ORDER BY symbol_norm, h
+"""
+
+class EquityRingBuffer:
+    """
+    Fixed-capacity ring of equity observations with a cached window peak.
+    push() is O(1) and allocation-free; only evicting the current peak
+    triggers an O(capacity) rescan.
+    """
+    def __init__(self, capacity: int = EQUITY_WINDOW):
+        self.capacity = capacity
+        self.buf = np.zeros(capacity, dtype=np.float64)
+        self.n = 0
+        self.i = 0
+        self.peak = -np.inf
+
+    def __len__(self) -> int:
+        return self.n
+
+    def push(self, value: float):
+        evicted = self.buf[self.i] if self.n == self.capacity else None
+        self.buf[self.i] = value
+        self.i = (self.i + 1) % self.capacity
+        self.n = min(self.n + 1, self.capacity)
+        
+        if value >= self.peak:
+            self.peak = value
+        elif evicted is not None and evicted >= self.peak:
+            self.peak = float(self.buf.max()) # Buffer is full, every slot is live
+
+    def current(self) -> float:
+        return float(self.buf[(self.i - 1) % self.capacity])
+
+    def values(self) -> np.ndarray:
+        """Window contents in chronological order."""
+        if self.n < self.capacity:
+            return self.buf[:self.n].copy()
+        return np.concatenate([self.buf[self.i:], self.buf[:self.i]])
+
 class RiskAgent:
-    def __init__(self, market_db_path: str = "market_data.duckdb"):
-        self.duck_conn = init_duckdb(market_db_path)
+    def __init__(self, market_db_path: str = "market_data.duckdb", read_only: bool = False,
+                 equity_window: int = EQUITY_WINDOW):
+        if read_only:
+            # Separate processes (replay workers) can't share the in-process connection
+            self.duck_conn = init_duckdb(market_db_path, read_only=True)
+        else:
+            self.duck_conn = duck.get_connection(market_db_path)
+        self._vol_cache: Dict[str, Tuple[float, float]] = {} # symbol -> (vol, expiry)
+        
+        self._equity = EquityRingBuffer(equity_window)
+
+    @property
+    def equity_curve(self) -> np.ndarray:
+        """Recorded total_equity_usd values within the window (chronological)."""
+        return self._equity.values()
+
+    @property
+    def equity_window(self) -> int:
+        """Maximum number of equity observations kept."""
+        return self._equity.capacity
+
+    def update_equity(self, equity: float):
+        """Record a new equity observation; the window peak is maintained in O(1)."""
+        self._equity.push(equity)
 
-    def compute_metrics(self, snapshot: PortfolioSnapshot, equity_curve: List[float]) -> Dict[str, Any]:
+    def compute_metrics(self, snapshot: PortfolioSnapshot, equity_curve: Optional[Sequence[float]] = None) -> Dict[str, Any]:
         """
         Compute Risk Metrics: VaR and Drawdown.
-        equity_curve: List of historical total_equity_usd values (chronological).
+        equity_curve: Optional explicit history of total_equity_usd values (chronological).
+        When omitted, drawdown is measured from the peak of the window recorded via update_equity.
         """
         
-        if not equity_curve:
-            current_drawdown = 0.0
-        else:
-            peak = max(equity_curve)
-            current = equity_curve[-1]
-            if peak > 0:
-                current_drawdown = (peak - current) / peak
+        if equity_curve is not None:
+            ec = np.asarray(equity_curve, dtype=np.float64)
+            if len(ec) == 0:
+                peak = current = 0.0
             else:
-                current_drawdown = 0.0
-                
+                peak = float(np.max(ec))
+                current = float(ec[-1])
+        else:
+            ec = self._equity.values()
+            current = snapshot.total_equity_usd
+            peak = max(self._equity.peak, current)
+            
+        # Path statistics over the whole window; VaR horizon is one observation (one cycle)
+        max_dd, hist_var = rolling_drawdown_var(ec, 0.05)
+            
+        if peak > 0:
+            current_drawdown = (peak - current) / peak
+        else:
+            current_drawdown = 0.0
         
-        total_var = 0.0
         z_score = 1.645
         
-        for pos in snapshot.positions:
-            vol = self._get_asset_volatility(pos.symbol)
-            notional = pos.size * pos.mark_price
-            pos_var = notional * vol * z_score
-            total_var += pos_var
+        f = snapshot.frame
+        uniques = f.unique_symbols.tolist()
+        vols = self._get_asset_volatilities(uniques)
+        # One lookup per distinct symbol, broadcast to positions via the factorized codes
+        vol_arr = np.fromiter((vols[s] for s in uniques), dtype=np.float64, count=len(uniques))[f.symbol_codes]
+        total_var = float(np.dot(f.notionals, vol_arr)) * z_score
             
         var_pct = 0.0
         if snapshot.total_equity_usd > 0:
@@ -45,7 +134,9 @@ class RiskAgent:
         
         return {
             "rolling_drawdown_pct": current_drawdown,
-            "var_95_1d_pct": var_pct
+            "var_95_1d_pct": var_pct,
+            "max_drawdown_pct": float(max_dd),
+            "hist_var_95_pct": float(hist_var)
         }
 
     def _get_asset_volatility(self, symbol: str) -> float:
@@ -53,43 +144,86 @@ class RiskAgent:
         Fetch annualized volatility for symbol from DuckDB.
         Returns 0.0 if insufficient data.
         """
+        return self._get_asset_volatilities([symbol])[symbol]
+
+    def _get_asset_volatilities(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Fetch annualized volatility for each symbol, issuing a single DuckDB
+        query for every symbol not already cached.
+        Results are cached per symbol for VOL_CACHE_TTL_SECONDS.
+        """
+        now = time.monotonic()
+        vols: Dict[str, float] = {}
+        missing: List[str] = []
+        
+        for symbol in dict.fromkeys(symbols):
+            cached = self._vol_cache.get(symbol)
+            if cached and cached[1] > now:
+                vols[symbol] = cached[0]
+            else:
+                missing.append(symbol)
+                
+        if missing:
+            fresh = self._query_asset_volatilities(missing)
+            for symbol in missing:
+                vol = fresh.get(symbol, 0.0)
+                self._vol_cache[symbol] = (vol, now + VOL_CACHE_TTL_SECONDS)
+                vols[symbol] = vol
+                
+        return vols
+
+    def _query_asset_volatilities(self, symbols: List[str]) -> Dict[str, float]:
+        """Compute annualized volatility for symbols from the last 24h of ticks."""
         try:
-            search_sym = symbol.replace("/", "").replace("-USD", "").replace("-", "")
+            norms = {s: normalize_symbol(s) for s in symbols}
+            distinct_norms = list(dict.fromkeys(norms.values()))
             
-            # Fetch last 24h of 'last' price
-            q = f"""
-                SELECT last, timestamp 
-                FROM market_ticks 
-                WHERE symbol ILIKE '%{search_sym}%'
-                AND timestamp > now() - INTERVAL '1 day'
-                ORDER BY timestamp ASC
-            """
+            q = _HOURLY_CLOSE_SQL.format(placeholders=", ".join("?" * len(distinct_norms)))
+            # Per-call cursor: compute_metrics may run on worker threads concurrently
+            cur = self.duck_conn.cursor()
+            try:
+                res = cur.execute(q, distinct_norms).fetchnumpy()
+            finally:
+                cur.close()
             
-            # Use fetchdf to get pandas dataframe
-            df = self.duck_conn.execute(q).fetchdf()
+            syms = res["symbol_norm"]
+            closes = np.asarray(res["close"], dtype=np.float64)
+            ticks = np.asarray(res["n_ticks"], dtype=np.int64)
             
-            if len(df) < 10:
-                print(f"Warning: Insufficient vol data for {symbol} (found {len(df)} ticks)")
-                return 0.0
+            if len(syms) == 0:
+                return {}
                 
-            # Calculate simple realized volatility from tick returns (approximation)
-            # Ideally resample to hourly
-            df.set_index('timestamp', inplace=True)
-            # Resample to hourly close to standardize
-            hourly = df['last'].resample('h').last().dropna()
-            
-            if len(hourly) < 2:
-                return 0.0
+            norm_vols: Dict[str, float] = {}
+            # Rows are ordered by symbol, so each symbol is a contiguous slice
+            starts = np.flatnonzero(np.r_[True, syms[1:] != syms[:-1]])
+            ends = np.r_[starts[1:], len(syms)]
             
-            returns = hourly.pct_change().dropna()
-            vol = returns.std() * np.sqrt(24 * 365) # Annualized
-            
-            if np.isnan(vol):
-                return 0.0
+            for start, end in zip(starts, ends):
+                norm = syms[start]
+                n_ticks = int(ticks[start:end].sum())
+                if n_ticks < MIN_VOL_TICKS:
+                    logger.warning(f"Insufficient vol data for {norm} (found {n_ticks} ticks)")
+                    continue
+                    
+                vol = self._annualized_vol(closes[start:end])
+                logger.info(f"Computed Volatility for {norm}: {vol:.2%}")
+                norm_vols[norm] = vol
                 
-            logger.info(f"Computed Volatility for {symbol}: {vol:.2%}")
-            return vol
+            return {s: norm_vols[n] for s, n in norms.items() if n in norm_vols}
             
         except Exception as e:
-            logger.error(f"Error calculating vol for {symbol}: {e}")
-            return 0.0 
+            logger.error(f"Error calculating vol for {symbols}: {e}")
+            return {}
+
+    @staticmethod
+    def _annualized_vol(hourly_closes: np.ndarray) -> float:
+        """Annualized sample stddev of hourly log returns. 0.0 if fewer than two returns."""
+        if len(hourly_closes) < 3:
+            return 0.0
+            
+        log_returns = np.diff(np.log(hourly_closes))
+        vol = log_returns.std(ddof=1) * np.sqrt(HOURS_PER_YEAR)
+        
+        if not np.isfinite(vol): # NaN, or a non-positive price in the window
+            return 0.0
+        return float(vol)
@@ -1,5 +1,9 @@
 import logging
 import json
+import time
+import hashlib
+import httpx
+from collections import OrderedDict
 from openai import AsyncOpenAI
 from typing import Dict, Any, Optional
 from src.core.config import settings
@@ -7,14 +11,25 @@ from src.models.schema import PortfolioSnapshot, AnalyticsSnapshot
 
 logger = logging.getLogger(__name__)
 
+BRIEFING_CACHE_SIZE = 128
+BRIEFING_CACHE_TTL_SECONDS = 300.0
+
 class LLMAnalystAgent:
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
+        self.model = settings.OPENAI_MODEL
         if self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # Long-lived pooled HTTP/2 connection so briefings reuse the TLS session
+            http_client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=40, keepalive_expiry=300),
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
+            self.client = AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=3)
         else:
             self.client = None
             logger.warning("LLM Analyst initialized without API Key. Capabilities disabled.")
+        self._briefing_cache: OrderedDict[str, tuple[str, float]] = OrderedDict() # key -> (briefing, expiry)
 
     async def generate_briefing(self, 
                                 portfolio: PortfolioSnapshot, 
@@ -37,6 +52,13 @@ class LLMAnalystAgent:
             "top_position": portfolio.positions[0].symbol if portfolio.positions else "None"
         }
         
+        key = self._cache_key(context)
+        cached = self._briefing_cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            self._briefing_cache.move_to_end(key)
+            logger.debug("LLM briefing cache hit")
+            return cached[0]
+        
         prompt = f"""
         You are a Senior Risk Analyst for a crypto hedge fund. 
         Analyze the following portfolio state and provide a concise executive summary.
@@ -60,7 +82,36 @@ class LLMAnalystAgent:
                 ],
                 temperature=0.7
             )
-            return response.choices[0].message.content
+            briefing = response.choices[0].message.content
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
             return f"Error generating insight: {e}"
+            
+        self._briefing_cache[key] = (briefing, time.monotonic() + BRIEFING_CACHE_TTL_SECONDS)
+        self._briefing_cache.move_to_end(key)
+        if len(self._briefing_cache) > BRIEFING_CACHE_SIZE:
+            self._briefing_cache.popitem(last=False)
+        return briefing
+
+    @staticmethod
+    def _cache_key(context: Dict[str, Any]) -> str:
+        """
+        Content hash of the briefing context. Values are quantized so that
+        immaterial moves (e.g. a few dollars of equity) reuse the cached briefing.
+        """
+        quantized = {
+            **context,
+            "total_equity": round(context["total_equity"], -2),
+            "unrealized_pnl": round(context["unrealized_pnl"], -2),
+            "net_exposure": round(context["net_exposure"], -2),
+            "concentration_hhi": round(context["concentration_hhi"], 3),
+            "drawdown": round(context["drawdown"], 4) if context["drawdown"] is not None else None,
+            "var_95": round(context["var_95"], 4) if context["var_95"] is not None else None,
+        }
+        payload = json.dumps(quantized, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool."""
+        if self.client:
+            await self.client.close()
@@ -1,26 +1,45 @@
 import asyncio
 import json
 import logging
+import orjson
 import websockets
+import numpy as np
+import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Callable, Optional
 import duckdb
-from src.models.schema import MarketTicker, init_duckdb
+from src.models.schema import TickerRow, normalize_symbol
+from src.core import duck
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+TICK_FLUSH_SIZE = 500
+WRITE_QUEUE_MAXSIZE = 10000
+
+# Built once at import. executemany prepares _INSERT_TICK_SQL a single time per
+# batch and binds every row against it, so ticks are never re-parsed individually.
+_TICK_COLUMNS = "venue, symbol, timestamp, bid, ask, last, volume_24h, symbol_norm"
+_INSERT_TICK_SQL = f"INSERT INTO market_ticks ({_TICK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_FRAME_SQL = f"INSERT INTO market_ticks ({_TICK_COLUMNS}) SELECT {_TICK_COLUMNS} FROM mid_batch"
+
 class MarketDataAgent:
     def __init__(self, db_path: str = "market_data.duckdb"):
-        self.duck_conn = init_duckdb(db_path)
+        # Own cursor on the process-wide connection; readers take their own cursors
+        self.duck_conn = duck.cursor(db_path)
         self.running = False
         self.tasks = []
+        # Items are TickerRow or a columnar pd.DataFrame batch; None stops the writer.
+        # Only the writer task touches duck_conn once ingestion has started.
+        self._write_q: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_MAXSIZE)
+        self._writer_task: Optional[asyncio.Task] = None
         
     async def start(self):
         """Start ingesting data from configured exchanges."""
         self.running = True
         logger.info("Starting Market Data Agent...")
         
+        self._writer_task = asyncio.create_task(self._writer_loop())
         self.tasks.append(asyncio.create_task(self._connect_binance(["btcusdt", "ethusdt"])))
         self.tasks.append(asyncio.create_task(self._connect_hyperliquid()))
         
@@ -33,25 +52,82 @@ class MarketDataAgent:
         self.running = False
         for task in self.tasks:
             task.cancel()
+        if self._writer_task:
+            # Let the writer persist everything queued ahead of the sentinel
+            await self._write_q.put(None)
+            await self._writer_task
         logger.info("Market Data Agent stopped.")
 
-    async def _parameterized_persist(self, ticker: MarketTicker):
-        """Persist ticker to DuckDB."""
-        try:
-             self.duck_conn.execute(
-                "INSERT INTO market_ticks VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (
-                    ticker.venue, 
-                    ticker.symbol, 
-                    ticker.timestamp, 
-                    ticker.bid, 
-                    ticker.ask, 
-                    ticker.last, 
-                    ticker.volume_24h
-                )
-            )
-        except Exception as e:
-            logger.error(f"Failed to persist ticker: {e}")
+    async def _parameterized_persist(self, ticker: TickerRow):
+        """Queue ticker row for the background writer (waits if the queue is full)."""
+        await self._write_q.put(ticker)
+
+    async def _writer_loop(self):
+        """
+        Await the next queued item, drain whatever else is already queued (up to
+        TICK_FLUSH_SIZE rows) and insert the batch on a worker thread.
+        """
+        stopping = False
+        while not stopping:
+            item = await self._write_q.get()
+            rows: List[TickerRow] = []
+            frames: List[pd.DataFrame] = []
+            
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, pd.DataFrame):
+                    frames.append(item)
+                else:
+                    rows.append(item)
+                    
+                if len(rows) >= TICK_FLUSH_SIZE:
+                    break
+                try:
+                    item = self._write_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                    
+            await asyncio.to_thread(self._write_batch, rows, frames)
+
+    def _write_batch(self, rows: List[TickerRow], frames: List[pd.DataFrame]):
+        """Insert buffered rows with one executemany and each columnar batch with one INSERT ... SELECT."""
+        if rows:
+            try:
+                self.duck_conn.executemany(_INSERT_TICK_SQL, rows)
+            except Exception as e:
+                logger.error(f"Failed to persist {len(rows)} tickers: {e}")
+                
+        for mid_batch in frames:
+            try:
+                self.duck_conn.register("mid_batch", mid_batch)
+                self.duck_conn.execute(_INSERT_FRAME_SQL)
+            except Exception as e:
+                logger.error(f"Failed to persist {len(mid_batch)} Hyperliquid mids: {e}")
+            finally:
+                self.duck_conn.unregister("mid_batch")
+
+    async def _persist_mid_batch(self, mids: Dict[str, str], ts: datetime):
+        """
+        Queue a whole allMids message as one columnar batch.
+        Skips per-symbol row construction on this hot path.
+        """
+        n = len(mids)
+        symbols = list(mids.keys())
+        prices = np.fromiter((float(v) for v in mids.values()), dtype=np.float64, count=n)
+        
+        mid_batch = pd.DataFrame({
+            "venue": "hyperliquid",
+            "symbol": symbols,
+            "timestamp": ts,
+            "bid": prices,
+            "ask": prices,
+            "last": prices,
+            "volume_24h": 0.0, # Not provided in allMids
+            "symbol_norm": [normalize_symbol(sym) for sym in symbols]
+        })
+        
+        await self._write_q.put(mid_batch)
 
     async def _connect_binance(self, symbols: List[str]):
         """Connect to Binance WebSocket for multiple symbols."""
@@ -62,22 +138,32 @@ class MarketDataAgent:
             try:
                 async with websockets.connect(url) as ws:
                     logger.info(f"Connected to Binance WS for {symbols}")
+                    
+                    # Hoisted lookups for the per-tick loop
+                    recv = ws.recv
+                    loads = orjson.loads
+                    persist = self._parameterized_persist
+                    from_ts = datetime.fromtimestamp
+                    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+                    
                     while self.running:
-                        msg = await ws.recv()
-                        data = json.loads(msg)
+                        data = loads(await recv())
                         
-                        ticker = MarketTicker(
-                            venue="binance",
-                            symbol=data['s'], # Symbol e.g. BTCUSDT
-                            timestamp=datetime.fromtimestamp(data['E'] / 1000),
-                            bid=float(data['b']),
-                            ask=float(data['a']),
-                            last=float(data['c']),
-                            volume_24h=float(data['v'])
+                        symbol = data['s'] # Symbol e.g. BTCUSDT
+                        ticker = TickerRow(
+                            "binance",
+                            symbol,
+                            from_ts(data['E'] / 1000),
+                            float(data['b']),
+                            float(data['a']),
+                            float(data['c']),
+                            float(data['v']),
+                            normalize_symbol(symbol)
                         )
                         
-                        await self._parameterized_persist(ticker)
-                        logger.debug(f"Binance Tick: {ticker.symbol} ${ticker.last}")
+                        await persist(ticker)
+                        if debug_enabled:
+                            logger.debug("Binance Tick: %s $%s", ticker.symbol, ticker.last)
                         
             except Exception as e:
                 logger.error(f"Binance WS connection error: {e}")
@@ -98,26 +184,20 @@ class MarketDataAgent:
                     }
                     await ws.send(json.dumps(sub_msg))
                     
+                    recv = ws.recv
+                    loads = orjson.loads
+                    persist_batch = self._persist_mid_batch
+                    now = datetime.now
+                    
                     while self.running:
-                        msg = await ws.recv()
-                        data = json.loads(msg)
+                        data = loads(await recv())
                         
                         if data.get("channel") == "allMids":
                             mids = data.get("data", {}).get("mids", {})
-                            ts = datetime.now() # Hyperliquid allMids doesn't send TS per tick, use local
+                            ts = now() # Hyperliquid allMids doesn't send TS per tick, use local
                             
-                            for symbol, price in mids.items():
-                                price_f = float(price)
-                                ticker = MarketTicker(
-                                    venue="hyperliquid",
-                                    symbol=symbol,
-                                    timestamp=ts,
-                                    bid=price_f,
-                                    ask=price_f,
-                                    last=price_f,
-                                    volume_24h=0.0 # Not provided in allMids
-                                )
-                                await self._parameterized_persist(ticker)
+                            if mids:
+                                await persist_batch(mids, ts)
                                 
             except Exception as e:
                 logger.error(f"Hyperliquid WS connection error: {e}")
@@ -1,57 +1,203 @@
 import asyncio
+import hashlib
 import logging
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import struct
+import time
+from collections import defaultdict
+import aiohttp
+import msgspec
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
 import ccxt.async_support as ccxt
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import select
+from sqlalchemy import select, insert, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from src.core.config import settings
-from src.models.schema import Base, PortfolioSnapshot, PositionSnapshot, NormalizedPosition
+from src.models.schema import Base, PortfolioSnapshot, PositionSnapshot, AnalyticsSnapshot, NormalizedPosition
+
+__all__ = ["PortfolioStateAgent"]
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_CACHE_TTL_SECONDS = 3.0
+VENUE_TIMEOUT_SECONDS = 5.0
+VENUE_FAILURE_THRESHOLD = 3 # Consecutive failures before a venue is skipped
+VENUE_COOLDOWN_SECONDS = 30.0
+VENUE_STALE_MAX_AGE_SECONDS = 4 * VENUE_COOLDOWN_SECONDS # Last good positions older than this are dropped
+_POSITION_STATE = struct.Struct("<5d") # size, entry, mark, upnl, leverage
+
+class _HLPosition(msgspec.Struct):
+    coin: str = "UNKNOWN"
+    szi: float = 0.0
+    entryPx: Optional[float] = None
+    unrealizedPnl: float = 0.0
+
+class _HLAssetPosition(msgspec.Struct):
+    position: _HLPosition = msgspec.field(default_factory=_HLPosition)
+
+class _HLClearinghouseState(msgspec.Struct):
+    """Subset of Hyperliquid's clearinghouseState response we read; other fields are skipped."""
+    assetPositions: List[_HLAssetPosition] = []
+
+# strict=False: Hyperliquid sends numbers as strings ("szi": "-0.5")
+_decode_clearinghouse_state = msgspec.json.Decoder(_HLClearinghouseState, strict=False).decode
+
+def _is_file_sqlite(db_url: str) -> bool:
+    url = make_url(db_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def _engine_kwargs(db_url: str, reader: bool = False) -> Dict[str, Any]:
+    """
+    Pooling options. File SQLite gets one pooled writer (SQLite serializes writes
+    anyway) plus a small reader pool; in-memory SQLite runs on a StaticPool that
+    takes no sizing.
+    """
+    if ":memory:" in db_url:
+        return {}
+    if _is_file_sqlite(db_url):
+        size = 5 if reader else 1
+        return {"poolclass": AsyncAdaptedQueuePool, "pool_size": size, "max_overflow": 0,
+                "pool_recycle": 3600, "pool_pre_ping": True}
+    return {"pool_size": 10, "max_overflow": 20, "pool_pre_ping": True}
+
+def _read_only_url(db_url: str) -> URL:
+    """Same SQLite file opened with mode=ro, so readers can never take the write lock."""
+    url = make_url(db_url)
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"})
+
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # Readers don't block the cycle's writer
+    "PRAGMA synchronous=NORMAL",    # fsync at checkpoints only; safe under WAL
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",     # ~64 MB page cache
+    "PRAGMA mmap_size=268435456",   # 256 MB
+)
+
+def _set_sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cur.execute(pragma)
+    cur.close()
+
+def _set_sqlite_reader_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for pragma in _SQLITE_PRAGMAS[2:]: # journal mode/sync are the writer's to set
+        cur.execute(pragma)
+    cur.close()
+
 class PortfolioStateAgent:
+    # Core statements built once; SQLAlchemy caches their compiled form
+    _INSERT_SNAPSHOT = insert(PortfolioSnapshot).returning(PortfolioSnapshot.id)
+    _INSERT_POSITION = insert(PositionSnapshot)
+    _INSERT_ANALYTICS = insert(AnalyticsSnapshot)
+    
     def __init__(self, db_url: str = settings.DATABASE_URL):
-        self.engine = create_async_engine(db_url)
+        self.engine = create_async_engine(db_url, **_engine_kwargs(db_url))
+        if make_url(db_url).get_backend_name() == "sqlite":
+            event.listen(self.engine.sync_engine, "connect", _set_sqlite_pragmas)
         self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
-        self.binance = None
+        
+        # Readers (history loads, API queries) use their own pool so they keep a
+        # warm page cache and never queue behind the writer connection
+        if _is_file_sqlite(db_url):
+            self._read_engine = create_async_engine(_read_only_url(db_url), **_engine_kwargs(db_url, reader=True))
+            event.listen(self._read_engine.sync_engine, "connect", _set_sqlite_reader_pragmas)
+        else:
+            self._read_engine = self.engine
+        self.read_session = async_sessionmaker(self._read_engine, expire_on_commit=False)
         self.hyperliquid_address = settings.HYPERLIQUID_WALLET_ADDRESS
         
+        # Long-lived ccxt clients (created lazily) so each poll reuses keep-alive connections
+        self._binance: Optional[ccxt.binance] = None
+        self._okx: Optional[ccxt.okx] = None
+        self._delta: Optional[ccxt.delta] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        
+        # Last persisted snapshot, served to burst readers (API, scenarios) within the TTL
+        self._cached_snapshot: Optional[PortfolioSnapshot] = None
+        self._cached_at: float = 0.0
+        self._ttl = SNAPSHOT_CACHE_TTL_SECONDS
+        
+        # Hash of the last persisted position state, to skip writing identical snapshots
+        self._last_hash: Optional[bytes] = None
+        self._last_persisted: Optional[PortfolioSnapshot] = None
+        
+        # Per-venue circuit breaker; recent last good positions are served while a venue is down
+        self._failures: Dict[str, int] = defaultdict(int)
+        self._cooldown_until: Dict[str, float] = {}
+        self._last_positions: Dict[str, Tuple[float, List[NormalizedPosition]]] = {} # name -> (fetched at, positions)
+        
     async def init_db(self):
         """Initialize the database tables."""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
             
-    async def fetch_snapshot(self) -> PortfolioSnapshot:
+    async def fetch_snapshot(self, refresh: bool = False) -> PortfolioSnapshot:
+        """
+        Return the current portfolio state.
+        Reuses the last persisted snapshot if it is younger than the TTL;
+        refresh=True always goes to the exchanges.
+        """
+        if (not refresh and self._cached_snapshot is not None
+                and time.monotonic() - self._cached_at < self._ttl):
+            return self._cached_snapshot
+            
+        snapshot = await self._fetch_fresh_snapshot()
+        
+        # Swap in the just-persisted snapshot so readers never see pre-write state
+        self._cached_snapshot = snapshot
+        self._cached_at = time.monotonic()
+        return snapshot
+
+    async def _fetch_fresh_snapshot(self) -> PortfolioSnapshot:
         """Fetch current state from all exchanges and aggregate."""
-        timestamp = datetime.now()
+        timestamp = datetime.now(timezone.utc)
+        t0 = time.monotonic()
         
-        # 1. Fetch from exchanges (Parallel)
-        binance_positions = await self._fetch_binance_positions()
-        hyper_positions = await self._fetch_hyperliquid_positions() 
-        okx_positions = await self._fetch_okx_positions()
-        delta_positions = await self._fetch_delta_positions()
+        # 1. Fetch from exchanges (Parallel, each bounded by a timeout)
+        venue_results = await asyncio.gather(
+            self._run_venue("binance", self._fetch_binance_positions),
+            self._run_venue("hyperliquid", self._fetch_hyperliquid_positions),
+            self._run_venue("okx", self._fetch_okx_positions),
+            self._run_venue("delta", self._fetch_delta_positions)
+        )
+        
+        all_positions: List[NormalizedPosition] = []
+        for result in venue_results:
+            all_positions.extend(result)
+            
+        state_hash = self._state_hash(all_positions)
+        if state_hash == self._last_hash and self._last_persisted is not None:
+            logger.debug("Portfolio state unchanged, skipping insert")
+            return self._last_persisted.reobserved(timestamp)
         
-        all_positions = binance_positions + hyper_positions + okx_positions + delta_positions
+        # SoA view of the positions so aggregation runs in NumPy, not per-position bytecode
+        n = len(all_positions)
+        sizes = np.fromiter((p.size for p in all_positions), dtype=np.float64, count=n)
+        entry_prices = np.fromiter((p.entry_price for p in all_positions), dtype=np.float64, count=n)
+        leverages = np.fromiter((p.leverage or 0.0 for p in all_positions), dtype=np.float64, count=n)
+        upnls = np.fromiter((p.unrealized_pnl for p in all_positions), dtype=np.float64, count=n)
         
-        total_equity = 0.0 
-        total_margin = 0.0
-        total_upnl = 0.0
+        # Positions without leverage (e.g. Hyperliquid) contribute no margin
+        margins = np.divide(sizes * entry_prices, leverages, out=np.zeros(n), where=leverages > 0)
+        total_margin = float(margins.sum())
+        total_upnl = float(upnls.sum())
         
-        position_snapshots = []
         asset_breakdown = {}
+        if n:
+            base_assets = [p.base_asset for p in all_positions]
+            keys, inv = np.unique(base_assets, return_inverse=True)
+            exposures = np.bincount(inv, weights=sizes, minlength=len(keys))
+            asset_breakdown = {
+                str(k): {"net_exposure": float(e)} for k, e in zip(keys, exposures)
+            }
         
-        for pos in all_positions:
-            total_margin += (pos.size * pos.entry_price) / pos.leverage if pos.leverage else 0
-            total_upnl += pos.unrealized_pnl
-            
-            base_asset = pos.symbol.split('/')[0] if '/' in pos.symbol else pos.symbol
-            if base_asset not in asset_breakdown:
-                asset_breakdown[base_asset] = {"net_exposure": 0.0}
-            
-            asset_breakdown[base_asset]["net_exposure"] += pos.size
-            
-            position_snapshots.append(PositionSnapshot(
+        position_snapshots = [
+            PositionSnapshot(
                 venue=pos.venue,
                 symbol=pos.symbol,
                 side=pos.side,
@@ -60,7 +206,9 @@ class PortfolioStateAgent:
                 mark_price=pos.mark_price,
                 unrealized_pnl=pos.unrealized_pnl,
                 leverage=pos.leverage
-            ))
+            )
+            for pos in all_positions
+        ]
 
         total_equity = total_margin + total_upnl 
 
@@ -69,19 +217,187 @@ class PortfolioStateAgent:
             total_equity_usd=total_equity,
             total_margin_used_usd=total_margin,
             total_unrealized_pnl_usd=total_upnl,
-            asset_breakdown=asset_breakdown,
-            positions=position_snapshots
+            asset_breakdown=asset_breakdown
         )
         
-        await self._persist_snapshot(snapshot)
+        await self._persist_snapshot(snapshot, position_snapshots)
+        logger.debug("Snapshot fetched and persisted in %.1f ms", (time.monotonic() - t0) * 1000)
+        snapshot.as_of = timestamp
+        self._last_hash = state_hash
+        self._last_persisted = snapshot
         return snapshot
 
-    async def _persist_snapshot(self, snapshot: PortfolioSnapshot):
+    async def _run_venue(self, name: str, fetch: Callable[[], Awaitable[List[NormalizedPosition]]],
+                         timeout: float = VENUE_TIMEOUT_SECONDS) -> List[NormalizedPosition]:
+        """
+        Run one venue fetch under a timeout. After VENUE_FAILURE_THRESHOLD consecutive
+        failures the venue is skipped for VENUE_COOLDOWN_SECONDS. Failed or skipped
+        venues contribute their last successfully fetched positions while those are
+        younger than VENUE_STALE_MAX_AGE_SECONDS, and nothing after that.
+        """
+        now = time.monotonic()
+        if self._cooldown_until.get(name, 0.0) > now:
+            return self._stale_positions(name, now)
+            
+        try:
+            positions = await asyncio.wait_for(fetch(), timeout=timeout)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                logger.error(f"{name} fetch timed out after {timeout:.1f}s")
+            self._failures[name] += 1
+            if self._failures[name] >= VENUE_FAILURE_THRESHOLD:
+                logger.warning(f"{name} failed {self._failures[name]} times in a row, "
+                               f"skipping it for {VENUE_COOLDOWN_SECONDS:.0f}s")
+                self._cooldown_until[name] = now + VENUE_COOLDOWN_SECONDS
+                self._failures[name] = 0
+            return self._stale_positions(name, now)
+            
+        self._failures[name] = 0
+        self._last_positions[name] = (now, positions)
+        return positions
+
+    def _stale_positions(self, name: str, now: float) -> List[NormalizedPosition]:
+        """Last good positions for a venue that is down, or [] once they are too old."""
+        last = self._last_positions.get(name)
+        if last is None:
+            return []
+        fetched_at, positions = last
+        age = now - fetched_at
+        if age > VENUE_STALE_MAX_AGE_SECONDS:
+            logger.warning(f"{name} last good positions are {age:.0f}s old, dropping them from the snapshot")
+            del self._last_positions[name]
+            return []
+        if positions:
+            logger.warning(f"{name} unavailable, using {len(positions)} positions from {age:.0f}s ago")
+        return positions
+
+    @staticmethod
+    def _state_hash(positions: List[NormalizedPosition]) -> bytes:
+        """Order-independent digest of the fields that make up a snapshot."""
+        h = hashlib.blake2b(digest_size=16)
+        for p in sorted(positions, key=lambda p: (p.venue, p.symbol, p.side)):
+            h.update(f"{p.venue}\0{p.symbol}\0{p.side}\0".encode())
+            h.update(_POSITION_STATE.pack(p.size, p.entry_price, p.mark_price, p.unrealized_pnl, p.leverage or 0.0))
+        return h.digest()
+
+    async def load_recent_snapshots(self, limit: int = 1) -> List[PortfolioSnapshot]:
+        """Most recent persisted snapshots (newest first), positions loaded with one IN query."""
+        async with self.read_session() as session:
+            result = await session.execute(
+                select(PortfolioSnapshot)
+                .options(selectinload(PortfolioSnapshot.positions))
+                .order_by(PortfolioSnapshot.timestamp.desc())
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+
+    async def load_equity_history(self, limit: int) -> List[float]:
+        """
+        total_equity_usd of the last `limit` snapshots, oldest first.
+        Rows are only written when the position state changes, so a run of unchanged
+        cycles appears once: peaks and drawdown are unaffected, but the restored
+        window spans more wall-clock time than `limit` live cycles.
+        """
+        async with self.read_session() as session:
+            result = await session.execute(
+                select(PortfolioSnapshot.total_equity_usd)
+                .order_by(PortfolioSnapshot.timestamp.desc())
+                .limit(limit)
+            )
+            return list(reversed(result.scalars().all()))
+
+    async def aclose(self):
+        """Close exchange clients, the shared HTTP session and DB pools. Call once on shutdown."""
+        for client in (self._binance, self._okx, self._delta):
+            if client is not None:
+                await client.close()
+        self._binance = self._okx = self._delta = None
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+        if self._read_engine is not self.engine:
+            await self._read_engine.dispose()
+        await self.engine.dispose()
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=40, keepalive_timeout=30, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http
+
+    def _get_binance(self) -> ccxt.binance:
+        if self._binance is None:
+            self._binance = ccxt.binance({
+                'apiKey': settings.BINANCE_API_KEY,
+                'secret': settings.BINANCE_API_SECRET,
+                'options': {'defaultType': 'future'}
+            })
+        return self._binance
+
+    def _get_okx(self) -> ccxt.okx:
+        if self._okx is None:
+            self._okx = ccxt.okx({
+                'apiKey': settings.OKX_API_KEY,
+                'secret': settings.OKX_SECRET,
+                'password': settings.OKX_PASSWORD,
+                'options': {'defaultType': 'swap'} # Perpetuals
+            })
+        return self._okx
+
+    def _get_delta(self) -> ccxt.delta:
+        if self._delta is None:
+            self._delta = ccxt.delta({
+                'apiKey': settings.DELTA_API_KEY,
+                'secret': settings.DELTA_SECRET
+            })
+        return self._delta
+
+    async def _persist_snapshot(self, snapshot: PortfolioSnapshot, positions: List[PositionSnapshot]):
+        """
+        Insert the snapshot row (RETURNING its id), then all of its positions
+        with one executemany. Bypasses the ORM unit of work entirely.
+        """
         async with self.async_session() as session:
-            session.add(snapshot)
-            await session.commit()
-            logger.info(f"Persisted snapshot ID: {snapshot.id} with {len(snapshot.positions)} positions")
+            async with session.begin():
+                snapshot.id = (await session.execute(self._INSERT_SNAPSHOT, {
+                    "timestamp": snapshot.timestamp,
+                    "total_equity_usd": snapshot.total_equity_usd,
+                    "total_margin_used_usd": snapshot.total_margin_used_usd,
+                    "total_unrealized_pnl_usd": snapshot.total_unrealized_pnl_usd,
+                    "asset_breakdown": snapshot.asset_breakdown
+                })).scalar_one()
+                
+                if positions:
+                    await session.execute(self._INSERT_POSITION, [
+                        {
+                            "snapshot_id": snapshot.id,
+                            "venue": p.venue,
+                            "symbol": p.symbol,
+                            "side": p.side,
+                            "size": p.size,
+                            "entry_price": p.entry_price,
+                            "mark_price": p.mark_price,
+                            "unrealized_pnl": p.unrealized_pnl,
+                            "leverage": p.leverage
+                        }
+                        for p in positions
+                    ])
+                    
+        for p in positions:
+            p.snapshot_id = snapshot.id
+        # Attach the in-memory rows as already loaded so analytics never trigger a lazy load
+        set_committed_value(snapshot, "positions", positions)
+        logger.info(f"Persisted snapshot ID: {snapshot.id} with {len(positions)} positions")
+
 
+    async def persist_analytics(self, rows: List[Dict[str, Any]]):
+        """Insert AnalyticsSnapshot rows with one executemany in a single transaction."""
+        async with self.async_session() as session:
+            async with session.begin():
+                await session.execute(self._INSERT_ANALYTICS, rows)
+        logger.info(f"Persisted {len(rows)} analytics rows")
 
     async def _fetch_binance_positions(self) -> List[NormalizedPosition]:
         """Fetch positions from Binance Futures."""
@@ -90,15 +406,14 @@ class PortfolioStateAgent:
             return []
             
         try:
-            exchange = ccxt.binance({
-                'apiKey': settings.BINANCE_API_KEY,
-                'secret': settings.BINANCE_API_SECRET,
-                'options': {'defaultType': 'future'}
-            })
-            
+            exchange = self._get_binance()
             
-            raw_positions = await exchange.fetch_positions()
-            active_positions = [p for p in raw_positions if float(p['contracts']) > 0]
+            raw_positions = await exchange.fetch_positions(symbols=settings.TRACKED_SYMBOLS or None)
+            # Dormant products come back with zero notional; drop them before any parsing
+            active_positions = [
+                p for p in raw_positions
+                if p.get('notional') != 0 and float(p['contracts']) > 0
+            ]
             
             for p in active_positions:
                 size = float(p['contracts'])
@@ -118,10 +433,10 @@ class PortfolioStateAgent:
                     unrealized_pnl=unrealized_pnl,
                     leverage=leverage
                 ))
-                
-            await exchange.close()
+
         except Exception as e:
             logger.error(f"Binance fetch error: {e}")
+            raise # Counted by _run_venue's circuit breaker
             
         return positions
 
@@ -133,14 +448,9 @@ class PortfolioStateAgent:
             return []
             
         try:
-            exchange = ccxt.okx({
-                'apiKey': settings.OKX_API_KEY,
-                'secret': settings.OKX_SECRET,
-                'password': settings.OKX_PASSWORD,
-                'options': {'defaultType': 'swap'} # Perpetuals
-            })
+            exchange = self._get_okx()
             
-            raw_positions = await exchange.fetch_positions()
+            raw_positions = await exchange.fetch_positions(symbols=settings.TRACKED_SYMBOLS or None)
             for p in raw_positions:
                 size = float(p['contracts']) if p.get('contracts') else float(p['amount'])
                 if size == 0: continue
@@ -163,9 +473,9 @@ class PortfolioStateAgent:
                     unrealized_pnl=unrealized_pnl,
                     leverage=leverage
                 ))
-            await exchange.close()
         except Exception as e:
             logger.error(f"OKX fetch error: {e}")
+            raise # Counted by _run_venue's circuit breaker
             
         return positions
 
@@ -176,12 +486,9 @@ class PortfolioStateAgent:
             return []
             
         try:
-            exchange = ccxt.delta({
-                'apiKey': settings.DELTA_API_KEY,
-                'secret': settings.DELTA_SECRET
-            })
+            exchange = self._get_delta()
             
-            raw_positions = await exchange.fetch_positions()
+            raw_positions = await exchange.fetch_positions(symbols=settings.TRACKED_SYMBOLS or None)
             for p in raw_positions:
                 size = float(p['contracts']) if p.get('contracts') else float(p['amount'])
                 if size == 0: continue
@@ -204,10 +511,11 @@ class PortfolioStateAgent:
                     unrealized_pnl=unrealized_pnl,
                     leverage=leverage
                 ))
-            await exchange.close()
         except Exception as e:
             logger.error(f"Delta fetch error: {e}")
+            raise # Counted by _run_venue's circuit breaker
             
+        return positions
 
 
     async def _fetch_hyperliquid_positions(self) -> List[NormalizedPosition]:
@@ -223,45 +531,43 @@ class PortfolioStateAgent:
         }
         
         try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        asset_positions = data.get("assetPositions", [])
+            async with self._get_http().post(url, json=payload) as resp:
+                if resp.status == 200:
+                    state = _decode_clearinghouse_state(await resp.read())
+                    
+                    for item in state.assetPositions:
+                        pos = item.position
+                        coin = pos.coin
+                        sze = pos.szi
                         
-                        for item in asset_positions:
-                            pos = item.get("position", {})
-                            coin = pos.get("coin", "UNKNOWN")
-                            sze = float(pos.get("szi", 0))
-                            
-                            if sze == 0:
-                                continue
-                                
-                            side = "long" if sze > 0 else "short"
-                            size = abs(sze)
-                            entry_price = float(pos.get("entryPx", 0))
+                        if sze == 0:
+                            continue
                             
-                            unrealized_pnl = float(pos.get("unrealizedPnl", 0))
-                            mark_price = entry_price # Placeholder if not derived
-                            
-                            if size > 0:
-                                if side == "long":
-                                    mark_price = (unrealized_pnl / size) + entry_price
-                                else:
-                                    mark_price = entry_price - (unrealized_pnl / size)
-                            
-                            positions.append(NormalizedPosition(
-                                venue="hyperliquid",
-                                symbol=f"{coin}-USD",
-                                side=side,
-                                size=size,
-                                entry_price=entry_price,
-                                mark_price=mark_price,
-                                unrealized_pnl=unrealized_pnl,
-                                leverage=None 
-                            ))
+                        side = "long" if sze > 0 else "short"
+                        size = abs(sze)
+                        entry_price = pos.entryPx or 0.0
+                        
+                        unrealized_pnl = pos.unrealizedPnl
+                        mark_price = entry_price # Placeholder if not derived
+                        
+                        if size > 0:
+                            if side == "long":
+                                mark_price = (unrealized_pnl / size) + entry_price
+                            else:
+                                mark_price = entry_price - (unrealized_pnl / size)
+                        
+                        positions.append(NormalizedPosition(
+                            venue="hyperliquid",
+                            symbol=f"{coin}-USD",
+                            side=side,
+                            size=size,
+                            entry_price=entry_price,
+                            mark_price=mark_price,
+                            unrealized_pnl=unrealized_pnl,
+                            leverage=None 
+                        ))
         except Exception as e:
             logger.error(f"Hyperliquid fetch error: {e}")
+            raise # Counted by _run_venue's circuit breaker
             
         return positions
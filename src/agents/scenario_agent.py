@@ -1,10 +1,27 @@
-import copy
 import logging
-from typing import Dict, List, Any
-from src.models.schema import PortfolioSnapshot, PositionSnapshot
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+from src.models.schema import PortfolioSnapshot, PositionSnapshot, PositionsFrame
+from src.agents._shock_kernel import simulate_impacts
+
+__all__ = ["ScenarioAgent"]
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=8)
+def _build_shock_vec(snapshot: PortfolioSnapshot, shocks_key: frozenset) -> np.ndarray:
+    """
+    Per-position shock pct aligned with snapshot.frame, looked up by base asset.
+    Memoized per (snapshot, shocks) so repeated scenarios skip the lookup; the
+    snapshot hashes by identity, which also covers not-yet-persisted snapshots.
+    """
+    get = dict(shocks_key).get
+    bases = snapshot.frame.base_assets
+    vec = np.fromiter((get(b, 0.0) for b in bases), dtype=np.float64, count=len(bases))
+    vec.flags.writeable = False # Shared between callers
+    return vec
+
 class ScenarioAgent:
     def __init__(self):
         pass
@@ -12,8 +29,9 @@ class ScenarioAgent:
     def simulate_shock(self, snapshot: PortfolioSnapshot, shocks: Dict[str, float]) -> Dict[str, Any]:
         """
         Simulate a market shock on the portfolio.
-        shocks: Dict of symbol/asset -> percentage move (e.g., {"BTC": -0.10, "ETH": 0.05})
+        shocks: Dict of base asset -> percentage move (e.g., {"BTC": -0.10, "ETH": 0.05})
         Returns: Dict with simulated equity and PnL change.
+        Does not mutate `snapshot`; returns a fresh dict of simulated deltas.
         """
         if not snapshot.positions:
             return {
@@ -22,41 +40,28 @@ class ScenarioAgent:
                 "pnl_impact": 0.0
             }
 
-        simulated_equity = snapshot.total_equity_usd
-        pnl_impact = 0.0
+        f = snapshot.frame
+        shock_vec = _build_shock_vec(snapshot, frozenset(shocks.items()))
+        shocked = shock_vec != 0.0
         
+        new_marks = f.mark_prices * (1 + shock_vec)
+        new_pnl = f.sides * (new_marks - f.entry_prices) * f.sizes
+        # Unshocked positions keep their current PnL
+        pnl_changes = np.where(shocked, new_pnl - f.unrealized_pnl, 0.0)
         
-        simulated_positions = []
-
-        for pos in snapshot.positions:
-            shock_pct = 0.0
-            for asset, shock in shocks.items():
-                if asset in pos.symbol:
-                    shock_pct = shock
-                    break
-            
-            if shock_pct == 0.0:
-                continue
-                
-            original_mark = pos.mark_price
-            new_mark = original_mark * (1 + shock_pct)
-            
-            
-            if pos.side.lower() == 'long':
-                new_pnl = (new_mark - pos.entry_price) * pos.size
-            else:
-                new_pnl = (pos.entry_price - new_mark) * pos.size
-                
-            pnl_change = new_pnl - pos.unrealized_pnl
-            pnl_impact += pnl_change
-            simulated_equity += pnl_change
-            
-            simulated_positions.append({
-                "symbol": pos.symbol,
-                "original_mark": original_mark,
-                "new_mark": new_mark,
-                "pnl_change": pnl_change
-            })
+        pnl_impact = float(pnl_changes.sum())
+        simulated_equity = snapshot.total_equity_usd + pnl_impact
+        
+        idx = np.flatnonzero(shocked)
+        simulated_positions = [
+            {
+                "symbol": f.symbols[i],
+                "original_mark": float(f.mark_prices[i]),
+                "new_mark": float(new_marks[i]),
+                "pnl_change": float(pnl_changes[i])
+            }
+            for i in idx
+        ]
             
         logger.info(f"Scenario Result: Impact=${pnl_impact:.2f}, New Equity=${simulated_equity:.2f}")
         
@@ -66,3 +71,33 @@ class ScenarioAgent:
             "pnl_impact": pnl_impact,
             "details": simulated_positions
         }
+
+    def simulate_shocks_batch(self, snapshot: PortfolioSnapshot, shocks_matrix: np.ndarray,
+                              assets: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Evaluate K scenarios in one vectorized pass.
+        shocks_matrix: (K, N) pct moves aligned with snapshot.frame positions, or
+        (K, A) per-asset moves when `assets` names the A columns.
+        Returns: (K,) pnl impacts, matching simulate_shock's pnl_impact per row.
+        """
+        shocks = np.atleast_2d(np.asarray(shocks_matrix, dtype=np.float64))
+        if not snapshot.positions:
+            return np.zeros(shocks.shape[0])
+            
+        f = snapshot.frame
+        if assets is not None:
+            shocks = self._expand_asset_shocks(f, shocks, assets)
+        if shocks.shape[1] != len(f.sizes):
+            raise ValueError(f"Expected {len(f.sizes)} shock columns, got {shocks.shape[1]}")
+            
+        return simulate_impacts(f.sizes, f.entry_prices, f.mark_prices, f.unrealized_pnl,
+                                f.sides, np.ascontiguousarray(shocks))
+
+    @staticmethod
+    def _expand_asset_shocks(f: PositionsFrame, shocks: np.ndarray, assets: Sequence[str]) -> np.ndarray:
+        """Map (K, A) per-asset columns onto (K, N) positions; unlisted assets get 0."""
+        col = {a: j for j, a in enumerate(assets)}
+        idx = np.fromiter((col.get(b, -1) for b in f.base_assets), dtype=np.int64, count=len(f.base_assets))
+        # Trailing zero column absorbs positions whose asset is not shocked
+        padded = np.concatenate([shocks, np.zeros((shocks.shape[0], 1))], axis=1)
+        return padded[:, idx]
@@ -1,12 +1,17 @@
 import asyncio
 import logging
-from fastapi import FastAPI, BackgroundTasks
+from typing import Any, Dict
+import orjson
+from fastapi import FastAPI, BackgroundTasks, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
-from src.core.orchestrator import SystemOrchestrator
-from src.models.schema import PortfolioSnapshot, AnalyticsSnapshot
-from src.agents.scenario_agent import ScenarioAgent
+from src.core.orchestrator import SystemOrchestrator, RESPONSE_GZIP_MIN_SIZE, RESPONSE_GZIP_LEVEL
+from src.models.schema import PortfolioSnapshot, AnalyticsSnapshot, portfolio_payload, encode_json
 from src.agents.llm_analyst import LLMAnalystAgent
+from src.core.logger import setup_logging
 
+setup_logging()
 logger = logging.getLogger(__name__)
 
 orchestrator = SystemOrchestrator()
@@ -19,42 +24,71 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down API...")
     await orchestrator.stop()
 
-app = FastAPI(title="Agentic Portfolio Analytics API", lifespan=lifespan)
+class ORJSONResponse(JSONResponse):
+    """
+    JSON rendered by orjson (Rust), including NumPy scalars/arrays.
+    Defined here because fastapi.responses.ORJSONResponse is deprecated in newer FastAPI.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+app = FastAPI(title="Agentic Portfolio Analytics API", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
+
+# Snapshot payloads repeat field names, venues and symbols; small bodies go out as-is.
+# Responses that already set Content-Encoding (the pre-gzipped snapshot) pass through untouched.
+app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_GZIP_MIN_SIZE, compresslevel=RESPONSE_GZIP_LEVEL)
 
 @app.get("/")
 async def root():
     return {"status": "running", "environment": "development"}
 
-from src.models.schema import PortfolioDTO
-
 @app.get("/snapshot/latest")
-async def get_latest_snapshot():
+async def get_latest_snapshot(request: Request):
     """Retrieve the absolute latest portfolio state from memory or DB."""
-    snap = await orchestrator.portfolio_agent.fetch_snapshot()
+    snap = await orchestrator.current_snapshot()
     
-    portfolio_dto = PortfolioDTO.model_validate(snap)
+    # Serialized (and compressed) once by the cycle that produced this snapshot
+    if snap is orchestrator.latest_snapshot and orchestrator.latest_response_bytes is not None:
+        gz = orchestrator.latest_response_gzip
+        if gz is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(content=gz, media_type="application/json",
+                            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        return Response(content=orchestrator.latest_response_bytes, media_type="application/json")
     
-    exp = orchestrator.exposure_agent.compute_metrics(snap)
-    risk = orchestrator.risk_agent.compute_metrics(snap, [100000, snap.total_equity_usd])
+    portfolio_dto = portfolio_payload(snap)
     
+    # The cycle already computed analytics for its own snapshot
+    if snap is orchestrator.latest_snapshot and orchestrator.latest_analytics is not None:
+        analytics = orchestrator.latest_analytics
+    else:
+        analytics = await _compute_analytics(snap)
+    
+    return Response(
+        content=encode_json({"portfolio": portfolio_dto, "analytics": analytics}),
+        media_type="application/json"
+    )
+
+async def _compute_analytics(snap: PortfolioSnapshot) -> Dict[str, Any]:
+    """Exposure and risk off the event loop, concurrently; the shared frame is built once first."""
+    snap.ensure_frame()
+    exp, risk = await asyncio.gather(
+        asyncio.to_thread(orchestrator.exposure_agent.compute_metrics, snap),
+        asyncio.to_thread(orchestrator.risk_agent.compute_metrics, snap)
+    )
     return {
-        "portfolio": portfolio_dto,
-        "analytics": {
-            "exposure": exp,
-            "risk": risk
-        }
+        "exposure": exp,
+        "risk": risk
     }
 
 @app.post("/scenario/simulate")
 async def run_scenario(shocks: dict[str, float]):
     """Run a market shock simulation."""
-    agent = ScenarioAgent()
-    current_snap = await orchestrator.portfolio_agent.fetch_snapshot()
-    result = agent.simulate_shock(current_snap, shocks)
-    return result
+    current_snap = await orchestrator.current_snapshot()
+    return await asyncio.to_thread(orchestrator.scenario_agent.simulate_shock, current_snap, shocks)
 
 @app.post("/agent/ask")
 async def ask_agent():
     """Trigger LLM Analyst manually."""
-    current_snap = await orchestrator.portfolio_agent.fetch_snapshot()
+    current_snap = await orchestrator.current_snapshot()
     return {"message": "Agent interface ready. (Integration pending detailed connect)"}
@@ -1,8 +1,9 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Optional, List
 
 class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore", frozen=True)
 
     ENVIRONMENT: str = "development"
     LOG_LEVEL: str = "INFO"
@@ -17,9 +18,18 @@ class Settings(BaseSettings):
     
     DELTA_API_KEY: Optional[str] = None
     DELTA_SECRET: Optional[str] = None
+    
+    # ccxt symbols to request positions for; empty means every symbol on the account
+    TRACKED_SYMBOLS: List[str] = []
 
     DATABASE_URL: str = "sqlite+aiosqlite:///./portfolio.db"
     
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_MODEL: str = "gpt-4"
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide Settings; .env is read and validated once."""
+    return Settings()
 
-settings = Settings()
+settings = get_settings()
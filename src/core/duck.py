@@ -0,0 +1,33 @@
+"""
+Process-wide DuckDB connections, one per database path.
+Agents get cursors (independent connections to the same database instance)
+instead of opening their own, so they share one buffer pool and catalog.
+"""
+import threading
+from typing import Dict
+import duckdb
+from src.models.schema import init_duckdb
+
+DUCKDB_MEMORY_LIMIT = "512MB"
+DUCKDB_THREADS = 4
+
+_connections: Dict[str, duckdb.DuckDBPyConnection] = {}
+_lock = threading.Lock()
+
+def get_connection(db_path: str = "market_data.duckdb") -> duckdb.DuckDBPyConnection:
+    """Shared connection for db_path, created (schema + PRAGMAs) on first use."""
+    with _lock:
+        con = _connections.get(db_path)
+        if con is None:
+            con = init_duckdb(db_path)
+            con.execute(f"PRAGMA memory_limit='{DUCKDB_MEMORY_LIMIT}'")
+            con.execute(f"PRAGMA threads={DUCKDB_THREADS}")
+            _connections[db_path] = con
+        return con
+
+def cursor(db_path: str = "market_data.duckdb") -> duckdb.DuckDBPyConnection:
+    """
+    New cursor on the shared connection. Each cursor is safe to use from its
+    own thread; ":memory:" cursors all see the same in-memory database.
+    """
+    return get_connection(db_path).cursor()
@@ -3,13 +3,18 @@ import sys
 from src.core.config import settings
 
 def setup_logging():
+    """
+    Configure root logging. Call once from each entrypoint (src/main.py, src/api/main.py);
+    importing this module has no side effects. Existing root handlers are replaced,
+    so a reload never stacks duplicate StreamHandlers.
+    """
     logging.basicConfig(
         level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO),
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         handlers=[
             logging.StreamHandler(sys.stdout)
-        ]
+        ],
+        force=True
     )
 
-setup_logging()
 logger = logging.getLogger("AgenticAI")
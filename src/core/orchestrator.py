@@ -1,17 +1,41 @@
 import asyncio
+import gzip
 import logging
+import random
+import time
 from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 from src.agents.market_data import MarketDataAgent
 from src.agents.portfolio_state import PortfolioStateAgent
 from src.agents.analytics_exposure import ExposureAgent
 from src.agents.analytics_risk import RiskAgent
+from src.agents import _risk_kernels, _shock_kernel, analytics_exposure
 from src.agents.analytics_attribution import AttributionAgent
+from src.agents.scenario_agent import ScenarioAgent
 from src.agents.llm_analyst import LLMAnalystAgent
-from src.models.schema import AnalyticsSnapshot
+from src.models.schema import PortfolioSnapshot, portfolio_payload, encode_json
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+CYCLE_INTERVAL_SECONDS = 60.0
+ERROR_BACKOFF_INITIAL_SECONDS = 1.0 # First retry delay after a failed cycle, doubled per consecutive failure
+ERROR_BACKOFF_MAX_SECONDS = 60.0
+# API reads reuse the cycle's snapshot until a whole cycle (plus slack for a slow one) has passed
+SNAPSHOT_STALE_SLACK_SECONDS = 15.0
+SNAPSHOT_MAX_AGE_SECONDS = CYCLE_INTERVAL_SECONDS + SNAPSHOT_STALE_SLACK_SECONDS
+RESPONSE_GZIP_MIN_SIZE = 1024 # Smaller bodies aren't worth compressing
+RESPONSE_GZIP_LEVEL = 5
+ANALYTICS_FLUSH_SIZE = 10 # Cycles of analytics buffered per INSERT
+ANALYTICS_BUFFER_MAX = 5 * ANALYTICS_FLUSH_SIZE # Oldest rows are dropped beyond this while the DB is failing
+ANALYTICS_MAX_FLUSH_ATTEMPTS = 3 # Consecutive failed flushes before the buffered rows are discarded
+
+def _warmup_kernels():
+    """Compile every JIT kernel up front so neither cycle #1 nor the first scenario pays for it."""
+    analytics_exposure.warmup()
+    _risk_kernels.warmup()
+    _shock_kernel.warmup()
+
 class SystemOrchestrator:
     def __init__(self, use_memory_db: bool = False):
         self.market_agent = MarketDataAgent(db_path=":memory:" if use_memory_db else "market_data.duckdb")
@@ -19,7 +43,21 @@ class SystemOrchestrator:
         self.exposure_agent = ExposureAgent()
         self.risk_agent = RiskAgent(market_db_path=":memory:" if use_memory_db else "market_data.duckdb")
         self.attribution_agent = AttributionAgent()
+        self.scenario_agent = ScenarioAgent()
         self.llm_agent = LLMAnalystAgent()
+        self.previous_snapshot: Optional[PortfolioSnapshot] = None
+        
+        # Last cycle's results, served to API readers from memory
+        self.latest_snapshot: Optional[PortfolioSnapshot] = None
+        self.latest_analytics: Optional[Dict[str, Any]] = None
+        self.latest_response_bytes: Optional[bytes] = None # /snapshot/latest body for latest_snapshot
+        self.latest_response_gzip: Optional[bytes] = None # The same body gzipped once, if large enough
+        self.snapshot_ts: float = 0.0
+        
+        # AnalyticsSnapshot rows by snapshot_id, written in batches
+        self._analytics_buf: Dict[int, Dict[str, Any]] = {}
+        self._flushed_snapshot_id = 0
+        self._flush_failures = 0
         self.running = False
 
     async def start(self):
@@ -28,38 +66,138 @@ class SystemOrchestrator:
         
         asyncio.create_task(self.market_agent.start())
         await self.portfolio_agent.init_db()
+        await self._restore_history()
+        await asyncio.to_thread(_warmup_kernels)
         
+        # Deadlines are absolute, so cycle duration doesn't stretch the period
+        loop = asyncio.get_running_loop()
+        next_deadline = loop.time()
+        backoff = ERROR_BACKOFF_INITIAL_SECONDS
         while self.running:
             try:
                 await self.run_cycle()
-                await asyncio.sleep(60) # Run every minute
+                next_deadline += CYCLE_INTERVAL_SECONDS
+                backoff = ERROR_BACKOFF_INITIAL_SECONDS
             except Exception as e:
-                logger.error(f"Orchestrator Cycle Error: {e}")
-                await asyncio.sleep(5)
+                # Jittered exponential backoff so an outage isn't retried in lockstep
+                delay = backoff + random.random()
+                logger.error(f"Orchestrator Cycle Error: {e} (retrying in {delay:.1f}s)")
+                next_deadline = loop.time() + delay
+                backoff = min(backoff * 2, ERROR_BACKOFF_MAX_SECONDS)
+                
+            now = loop.time()
+            if next_deadline < now:
+                # Overran a whole period: realign instead of running cycles back-to-back
+                next_deadline = now
+            await asyncio.sleep(next_deadline - now)
+
+    async def _restore_history(self):
+        """Seed drawdown and attribution from persisted snapshots so a restart doesn't reset them."""
+        try:
+            for equity in await self.portfolio_agent.load_equity_history(self.risk_agent.equity_window):
+                self.risk_agent.update_equity(equity)
+            recent = await self.portfolio_agent.load_recent_snapshots(limit=1)
+            self.previous_snapshot = recent[0] if recent else None
+        except Exception as e:
+            logger.error(f"Could not restore snapshot history: {e}")
 
     async def run_cycle(self):
-        logger.info("--- Starting Analytics Cycle ---")
-        
-        snapshot = await self.portfolio_agent.fetch_snapshot()
+        logger.debug("cycle_start")
         
-        exp_metrics = self.exposure_agent.compute_metrics(snapshot)
+        snapshot = await self.portfolio_agent.fetch_snapshot(refresh=True)
         
-        equity_curve = [100000.0, snapshot.total_equity_usd] 
-        risk_metrics = self.risk_agent.compute_metrics(snapshot, equity_curve)
+        self.risk_agent.update_equity(snapshot.total_equity_usd)
+        exp_metrics, risk_metrics, attribution = await self.run_analytics(snapshot, self.previous_snapshot)
+        self.previous_snapshot = snapshot
         
-        analytics_snap = AnalyticsSnapshot(
-            snapshot_id=snapshot.id,
-            gross_exposure_usd=exp_metrics['gross_exposure_usd'],
-            net_exposure_usd=exp_metrics['net_exposure_usd'],
-            concentration_hhi=exp_metrics['concentration_hhi'],
-            rolling_drawdown_pct=risk_metrics['rolling_drawdown_pct'],
-            var_95_1d_pct=risk_metrics['var_95_1d_pct']
-        )
+        self._buffer_analytics({
+            "snapshot_id": snapshot.id,
+            "gross_exposure_usd": exp_metrics['gross_exposure_usd'],
+            "net_exposure_usd": exp_metrics['net_exposure_usd'],
+            "concentration_hhi": exp_metrics['concentration_hhi'],
+            "rolling_drawdown_pct": risk_metrics['rolling_drawdown_pct'],
+            "var_95_1d_pct": risk_metrics['var_95_1d_pct'],
+            "attribution_breakdown": attribution
+        })
+        if len(self._analytics_buf) >= ANALYTICS_FLUSH_SIZE:
+            await self.flush_analytics()
         
+        latest_analytics = {"exposure": exp_metrics, "risk": risk_metrics}
+        # Materialize the API response on write; repeat GETs only copy bytes
+        body = encode_json({"portfolio": portfolio_payload(snapshot), "analytics": latest_analytics})
+        self.latest_response_gzip = (gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+                                     if len(body) >= RESPONSE_GZIP_MIN_SIZE else None)
+        self.latest_response_bytes = body
+        self.latest_snapshot = snapshot
+        self.latest_analytics = latest_analytics
+        self.snapshot_ts = time.monotonic()
         
-        logger.info(f"Cycle Complete. Equity=${snapshot.total_equity_usd:.2f}, VaR={risk_metrics['var_95_1d_pct']:.2%}")
+        # Lazy %-formatting: nothing is rendered unless DEBUG is enabled
+        logger.debug("cycle_complete equity=%.2f var=%.4f",
+                     snapshot.total_equity_usd, risk_metrics['var_95_1d_pct'])
         
 
+    def _buffer_analytics(self, row: Dict[str, Any]):
+        """
+        Queue one analytics row. Unchanged portfolios reuse their snapshot id,
+        and snapshot_id is unique, so only the first row per snapshot is kept.
+        """
+        snapshot_id = row["snapshot_id"]
+        if snapshot_id <= self._flushed_snapshot_id or snapshot_id in self._analytics_buf:
+            return
+        self._analytics_buf[snapshot_id] = row
+        if len(self._analytics_buf) > ANALYTICS_BUFFER_MAX:
+            # Dicts keep insertion order, so the first key is the oldest row
+            dropped = next(iter(self._analytics_buf))
+            del self._analytics_buf[dropped]
+            logger.warning(f"Analytics buffer full, dropped row for snapshot {dropped}")
+
+    async def flush_analytics(self):
+        """
+        Write buffered analytics rows in one transaction. After
+        ANALYTICS_MAX_FLUSH_ATTEMPTS consecutive failures the batch is dropped,
+        so one bad row can't block every later flush.
+        """
+        if not self._analytics_buf:
+            return
+        rows = list(self._analytics_buf.values())
+        try:
+            await self.portfolio_agent.persist_analytics(rows)
+        except Exception as e:
+            self._flush_failures += 1
+            if self._flush_failures < ANALYTICS_MAX_FLUSH_ATTEMPTS:
+                logger.error(f"Failed to persist {len(rows)} analytics rows "
+                             f"(attempt {self._flush_failures}/{ANALYTICS_MAX_FLUSH_ATTEMPTS}): {e}")
+                return
+            logger.error(f"Dropping {len(rows)} analytics rows after "
+                         f"{self._flush_failures} failed flushes: {e}")
+        self._flush_failures = 0
+        self._flushed_snapshot_id = max(self._analytics_buf)
+        self._analytics_buf.clear()
+
+    async def current_snapshot(self, max_age: float = SNAPSHOT_MAX_AGE_SECONDS) -> PortfolioSnapshot:
+        """The last cycle's snapshot if younger than max_age, else a fetch."""
+        if self.latest_snapshot is not None and time.monotonic() - self.snapshot_ts < max_age:
+            return self.latest_snapshot
+        return await self.portfolio_agent.fetch_snapshot()
+
+    async def run_analytics(self,
+                            snapshot: PortfolioSnapshot,
+                            previous: Optional[PortfolioSnapshot]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        Run exposure, risk and attribution concurrently in worker threads.
+        NumPy and DuckDB release the GIL, so cycle latency tends to the slowest agent.
+        """
+        snapshot.ensure_frame()
+        return await asyncio.gather(
+            asyncio.to_thread(self.exposure_agent.compute_metrics, snapshot),
+            asyncio.to_thread(self.risk_agent.compute_metrics, snapshot),
+            asyncio.to_thread(self.attribution_agent.compute_attribution, snapshot, previous)
+        )
+
     async def stop(self):
         self.running = False
         await self.market_agent.stop()
+        await self.flush_analytics()
+        await self.portfolio_agent.aclose()
+        await self.llm_agent.aclose()
@@ -3,6 +3,11 @@ import logging
 from src.core.config import settings
 from src.core.logger import setup_logging
 
+try:
+    import uvloop # Optional (perf extra); libuv-backed event loop
+except ImportError:
+    uvloop = None
+
 setup_logging()
 logger = logging.getLogger(__name__)
 
@@ -18,4 +23,7 @@ async def main():
         logger.info("Shutting down system...")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -1,11 +1,76 @@
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import cached_property, lru_cache
+from typing import Optional, List, Dict, Any, Sequence, NamedTuple
 from sqlalchemy import String, Float, DateTime, Integer, JSON, create_engine, ForeignKey
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.orm.attributes import set_committed_value
 from pydantic import BaseModel, ConfigDict
 import duckdb
+import msgspec
+import numpy as np
+import pandas as pd
 
 
+@dataclass(frozen=True)
+class PositionsFrame:
+    """
+    Column-oriented (SoA) view of a snapshot's positions.
+    Analytics agents run vectorized math over these arrays instead of
+    dereferencing attributes on each position object.
+    """
+    symbols: np.ndarray          # object
+    base_assets: np.ndarray      # object, see extract_base_asset
+    sizes: np.ndarray            # float64
+    entry_prices: np.ndarray     # float64
+    mark_prices: np.ndarray      # float64
+    sides: np.ndarray            # int8, +1 long / -1 short
+    unrealized_pnl: np.ndarray   # float64
+    symbol_codes: np.ndarray     # int64 index into unique_symbols
+    unique_symbols: np.ndarray   # object
+
+    @classmethod
+    def from_positions(cls, positions: Sequence[Any]) -> "PositionsFrame":
+        n = len(positions)
+        symbols = np.array([p.symbol for p in positions], dtype=object)
+        codes, uniques = pd.factorize(symbols)
+        
+        return cls(
+            symbols=symbols,
+            base_assets=np.array([extract_base_asset(p.symbol) for p in positions], dtype=object),
+            sizes=np.fromiter((p.size for p in positions), dtype=np.float64, count=n),
+            entry_prices=np.fromiter((p.entry_price for p in positions), dtype=np.float64, count=n),
+            mark_prices=np.fromiter((p.mark_price for p in positions), dtype=np.float64, count=n),
+            sides=np.fromiter((side_sign(p.side) for p in positions), dtype=np.int8, count=n),
+            unrealized_pnl=np.fromiter((p.unrealized_pnl for p in positions), dtype=np.float64, count=n),
+            symbol_codes=codes,
+            unique_symbols=uniques
+        )
+
+    @property
+    def notionals(self) -> np.ndarray:
+        return self.sizes * self.mark_prices
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    Timezone-aware UTC DateTime on every backend. SQLite drops the offset on
+    storage, so values read back are re-tagged as UTC; aware values are stored as UTC.
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[datetime], dialect) -> Optional[datetime]:
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value: Optional[datetime], dialect) -> Optional[datetime]:
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
 class Base(DeclarativeBase):
     pass
 
@@ -13,14 +78,51 @@ class PortfolioSnapshot(Base):
     __tablename__ = "portfolio_snapshots"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, index=True)
+    timestamp: Mapped[datetime] = mapped_column(UTCDateTime, index=True)
     total_equity_usd: Mapped[float] = mapped_column(Float)
     total_margin_used_usd: Mapped[float] = mapped_column(Float)
     total_unrealized_pnl_usd: Mapped[float] = mapped_column(Float)
     
     asset_breakdown: Mapped[Dict[str, Any]] = mapped_column(JSON)
     
-    positions: Mapped[List["PositionSnapshot"]] = relationship(back_populates="snapshot", cascade="all, delete-orphan")
+    # lazy="raise": load with selectinload() or attach explicitly; an implicit lazy load would fail under asyncio anyway
+    positions: Mapped[List["PositionSnapshot"]] = relationship(back_populates="snapshot", cascade="all, delete-orphan", lazy="raise")
+
+    # Not persisted: last fetch that observed this state. Unchanged state isn't
+    # re-inserted, so `timestamp` is when the state first appeared.
+    as_of = None
+
+    @property
+    def last_seen(self) -> datetime:
+        return self.as_of or self.timestamp
+
+    def reobserved(self, as_of: datetime) -> "PortfolioSnapshot":
+        """
+        Detached copy of this snapshot seen again at as_of. Shares the positions and
+        the built frame; the original is left untouched for readers already holding it.
+        """
+        clone = PortfolioSnapshot(
+            id=self.id,
+            timestamp=self.timestamp,
+            total_equity_usd=self.total_equity_usd,
+            total_margin_used_usd=self.total_margin_used_usd,
+            total_unrealized_pnl_usd=self.total_unrealized_pnl_usd,
+            asset_breakdown=self.asset_breakdown
+        )
+        set_committed_value(clone, "positions", self.positions)
+        if "frame" in self.__dict__:
+            clone.__dict__["frame"] = self.__dict__["frame"]
+        clone.as_of = as_of
+        return clone
+
+    @cached_property
+    def frame(self) -> PositionsFrame:
+        """SoA view of positions, built once on first access."""
+        return PositionsFrame.from_positions(self.positions)
+
+    def ensure_frame(self) -> PositionsFrame:
+        """Build the frame now, e.g. before fanning agents out to threads that would each race to build it."""
+        return self.frame
 
 class PositionSnapshot(Base):
     __tablename__ = "position_snapshots"
@@ -71,6 +173,20 @@ class MarketTicker(BaseModel):
     last: float
     volume_24h: Optional[float] = None
 
+class TickerRow(NamedTuple):
+    """
+    Unvalidated market_ticks row for the ingestion hot path.
+    Field order matches the INSERT column list in MarketDataAgent.
+    """
+    venue: str
+    symbol: str
+    timestamp: datetime
+    bid: float
+    ask: float
+    last: float
+    volume_24h: float
+    symbol_norm: str
+
 class NormalizedPosition(BaseModel):
     venue: str
     symbol: str
@@ -82,9 +198,42 @@ class NormalizedPosition(BaseModel):
     liquidation_price: Optional[float] = None
     leverage: Optional[float] = None
     collateral: Optional[float] = None
+    
+    @cached_property
+    def base_asset(self) -> str:
+        """Derived from symbol on first access; not a model field, so it can't drift from it."""
+        return extract_base_asset(self.symbol)
+
+
+@lru_cache(maxsize=8)
+def side_sign(side: str) -> int:
+    """+1 for long, -1 otherwise; venues send a handful of distinct spellings."""
+    return 1 if side.lower() == 'long' else -1
 
+@lru_cache(maxsize=4096)
+def normalize_symbol(symbol: str) -> str:
+    """
+    Venue-agnostic symbol key used to match positions to market ticks.
+    e.g. 'BTC/USDT:USDT' -> 'BTCUSDT', 'BTC-USD' -> 'BTC'.
+    Must stay in sync with the backfill expression in init_duckdb.
+    Memoized: the symbol universe is small and every tick normalizes.
+    """
+    return symbol.split(":")[0].replace("/", "").replace("-USD", "").replace("-", "").upper()
 
-def init_duckdb(db_path: str = "market_data.duckdb"):
+@lru_cache(maxsize=4096)
+def extract_base_asset(symbol: str) -> str:
+    """Base asset of a venue symbol, e.g. 'BTC/USDT:USDT' -> 'BTC', 'ETH-USD' -> 'ETH'."""
+    base, sep, _ = symbol.partition('/') # Single scan, no list allocation
+    if sep:
+        return base
+    return symbol.partition('-')[0]
+
+
+def init_duckdb(db_path: str = "market_data.duckdb", read_only: bool = False):
+    if read_only:
+        # Readers (e.g. replay workers) share the file without taking the write lock
+        return duckdb.connect(db_path, read_only=True)
+        
     con = duckdb.connect(db_path)
     
     con.execute("""
@@ -95,10 +244,20 @@ def init_duckdb(db_path: str = "market_data.duckdb"):
             bid DOUBLE,
             ask DOUBLE,
             last DOUBLE,
-            volume_24h DOUBLE
+            volume_24h DOUBLE,
+            symbol_norm VARCHAR
         )
     """)
     
+    # Migrate databases created before symbol_norm existed
+    con.execute("ALTER TABLE market_ticks ADD COLUMN IF NOT EXISTS symbol_norm VARCHAR")
+    con.execute("""
+        UPDATE market_ticks
+        SET symbol_norm = upper(replace(replace(replace(split_part(symbol, ':', 1), '/', ''), '-USD', ''), '-', ''))
+        WHERE symbol_norm IS NULL
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_market_ticks_symbol_norm_ts ON market_ticks (symbol_norm, timestamp)")
+    
     con.execute("""
         CREATE TABLE IF NOT EXISTS funding_rates (
             venue VARCHAR,
@@ -110,12 +269,11 @@ def init_duckdb(db_path: str = "market_data.duckdb"):
     """)
     
     return con
-    return con
 
 
-class PositionDTO(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    
+# Read-path DTOs are msgspec Structs: built straight from typed ORM columns and
+# encoded in C, with no per-request validation. Pydantic stays on request bodies.
+class PositionDTO(msgspec.Struct):
     symbol: str
     venue: str
     side: str
@@ -125,12 +283,47 @@ class PositionDTO(BaseModel):
     unrealized_pnl: float
     leverage: Optional[float] = None
 
-class PortfolioDTO(BaseModel):
-    model_config = ConfigDict(from_attributes=True)
-    
+class PortfolioDTO(msgspec.Struct):
     id: int
     timestamp: datetime
+    as_of: datetime
     total_equity_usd: float
     total_unrealized_pnl_usd: float
     asset_breakdown: Optional[Dict[str, Any]] = None
     positions: List[PositionDTO] = []
+
+def portfolio_payload(snap: PortfolioSnapshot) -> PortfolioDTO:
+    """PortfolioDTO built directly from the ORM columns."""
+    return PortfolioDTO(
+        id=snap.id,
+        timestamp=snap.timestamp,
+        as_of=snap.last_seen,
+        total_equity_usd=snap.total_equity_usd,
+        total_unrealized_pnl_usd=snap.total_unrealized_pnl_usd,
+        asset_breakdown=snap.asset_breakdown,
+        positions=[
+            PositionDTO(
+                symbol=p.symbol,
+                venue=p.venue,
+                side=p.side,
+                size=p.size,
+                entry_price=p.entry_price,
+                mark_price=p.mark_price,
+                unrealized_pnl=p.unrealized_pnl,
+                leverage=p.leverage
+            )
+            for p in snap.positions
+        ]
+    )
+
+def _encode_numpy(obj: Any) -> Any:
+    """msgspec enc_hook: NumPy scalars and arrays that reach a payload become Python values."""
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise NotImplementedError(f"Cannot encode {type(obj).__name__}")
+
+_json_encoder = msgspec.json.Encoder(enc_hook=_encode_numpy)
+
+def encode_json(obj: Any) -> bytes:
+    """JSON bytes for DTO Structs and plain containers."""
+    return _json_encoder.encode(obj)
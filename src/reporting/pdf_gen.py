@@ -1,5 +1,5 @@
 from fpdf import FPDF
-from datetime import datetime
+from datetime import datetime, timezone
 
 class RiskReportPDF(FPDF):
     def header(self):
@@ -17,7 +17,7 @@ def generate_pdf_report(filename: str, metrics: dict, details: str):
     pdf.add_page()
     
     pdf.set_font("helvetica", size=12)
-    pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True)
+    pdf.cell(0, 10, f"Date: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M')} UTC", ln=True)
     pdf.ln(10)
     
     pdf.set_font("helvetica", "B", 14)
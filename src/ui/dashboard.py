@@ -44,7 +44,7 @@ positions = portfolio.get("positions", [])
 
 st.sidebar.header("Control Panel")
 st.sidebar.success("System Status: Online")
-st.sidebar.info(f"Last Update: {portfolio.get('timestamp')}")
+st.sidebar.info(f"Last Update: {portfolio.get('as_of', portfolio.get('timestamp'))}")
 
 col1, col2, col3, col4 = st.columns(4)
 with col1:
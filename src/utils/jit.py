@@ -0,0 +1,19 @@
+"""
+Optional numba support.
+numba is an optional dependency (`pip install -e .[perf]`); without it,
+`njit` is a no-op decorator and callers should prefer their NumPy path.
+"""
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        
+        def decorator(func):
+            return func
+        return decorator
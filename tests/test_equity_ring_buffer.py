@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from src.agents.analytics_risk import EquityRingBuffer
+
+@pytest.mark.parametrize("capacity", [1, 2, 7, 64])
+def test_peak_matches_window_max(capacity):
+    rng = np.random.default_rng(capacity)
+    buf = EquityRingBuffer(capacity)
+    ref = []
+    for value in rng.normal(100.0, 10.0, size=20 * capacity):
+        buf.push(float(value))
+        ref.append(float(value))
+        assert buf.peak == max(ref[-capacity:])
+        assert len(buf) == min(len(ref), capacity)
+
+def test_peak_rescans_when_peak_is_evicted():
+    buf = EquityRingBuffer(3)
+    for value in (10.0, 5.0, 4.0):
+        buf.push(value)
+    assert buf.peak == 10.0
+    
+    buf.push(3.0) # Evicts 10.0
+    assert buf.peak == 5.0
+
+def test_values_are_chronological_after_wrap():
+    buf = EquityRingBuffer(4)
+    for value in range(1, 8):
+        buf.push(float(value))
+    np.testing.assert_array_equal(buf.values(), [4.0, 5.0, 6.0, 7.0])
+    assert buf.current() == 7.0
+
+def test_values_before_full():
+    buf = EquityRingBuffer(4)
+    assert buf.values().size == 0
+    buf.push(1.0)
+    buf.push(2.0)
+    np.testing.assert_array_equal(buf.values(), [1.0, 2.0])
@@ -0,0 +1,93 @@
+import pytest
+from src.core.orchestrator import (
+    SystemOrchestrator,
+    ANALYTICS_BUFFER_MAX,
+    ANALYTICS_MAX_FLUSH_ATTEMPTS,
+)
+
+def _row(snapshot_id: int) -> dict:
+    return {"snapshot_id": snapshot_id}
+
+@pytest.fixture
+async def orchestrator():
+    orchestrator = SystemOrchestrator(use_memory_db=True)
+    yield orchestrator
+    await orchestrator.portfolio_agent.aclose()
+
+class Sink:
+    """persist_analytics stub recording each batch; raises while `fail` is set."""
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    async def __call__(self, rows):
+        self.batches.append([r["snapshot_id"] for r in rows])
+        if self.fail:
+            raise RuntimeError("db down")
+
+@pytest.fixture
+def sink(orchestrator):
+    sink = Sink()
+    orchestrator.portfolio_agent.persist_analytics = sink
+    return sink
+
+async def test_repeated_snapshot_id_is_buffered_once(orchestrator, sink):
+    orchestrator._buffer_analytics(_row(1))
+    orchestrator._buffer_analytics(_row(1))
+    await orchestrator.flush_analytics()
+    
+    # Already flushed ids are skipped too
+    orchestrator._buffer_analytics(_row(1))
+    await orchestrator.flush_analytics()
+    assert sink.batches == [[1]]
+
+async def test_buffer_evicts_oldest_rows(orchestrator, sink):
+    for snapshot_id in range(1, ANALYTICS_BUFFER_MAX + 3):
+        orchestrator._buffer_analytics(_row(snapshot_id))
+    assert len(orchestrator._analytics_buf) == ANALYTICS_BUFFER_MAX
+    assert min(orchestrator._analytics_buf) == 3
+
+async def test_failed_flush_is_retried_then_dropped(orchestrator, sink):
+    sink.fail = True
+    orchestrator._buffer_analytics(_row(1))
+    for _ in range(ANALYTICS_MAX_FLUSH_ATTEMPTS - 1):
+        await orchestrator.flush_analytics()
+        assert 1 in orchestrator._analytics_buf
+        
+    await orchestrator.flush_analytics()
+    assert not orchestrator._analytics_buf
+    assert len(sink.batches) == ANALYTICS_MAX_FLUSH_ATTEMPTS
+    
+    # The dropped batch doesn't block later rows
+    sink.fail = False
+    orchestrator._buffer_analytics(_row(2))
+    await orchestrator.flush_analytics()
+    assert sink.batches[-1] == [2]
+
+async def test_success_resets_failure_count(orchestrator, sink):
+    sink.fail = True
+    orchestrator._buffer_analytics(_row(1))
+    await orchestrator.flush_analytics()
+    sink.fail = False
+    await orchestrator.flush_analytics()
+    
+    sink.fail = True
+    orchestrator._buffer_analytics(_row(2))
+    for _ in range(ANALYTICS_MAX_FLUSH_ATTEMPTS - 1):
+        await orchestrator.flush_analytics()
+    assert 2 in orchestrator._analytics_buf
+
+async def test_flush_writes_rows(orchestrator):
+    await orchestrator.portfolio_agent.init_db()
+    orchestrator._buffer_analytics({
+        "snapshot_id": 1,
+        "gross_exposure_usd": 1.0,
+        "net_exposure_usd": 1.0,
+        "concentration_hhi": 1.0,
+        "rolling_drawdown_pct": 0.0,
+        "var_95_1d_pct": 0.0,
+        "attribution_breakdown": {}
+    })
+    await orchestrator.flush_analytics()
+    assert not orchestrator._analytics_buf
+    assert orchestrator._flushed_snapshot_id == 1
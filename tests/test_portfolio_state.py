@@ -0,0 +1,112 @@
+import pytest
+from src.agents import portfolio_state
+from src.agents.portfolio_state import (
+    PortfolioStateAgent,
+    VENUE_FAILURE_THRESHOLD,
+    VENUE_COOLDOWN_SECONDS,
+    VENUE_STALE_MAX_AGE_SECONDS,
+)
+from src.models.schema import NormalizedPosition
+
+VENUES = ("_fetch_binance_positions", "_fetch_okx_positions",
+          "_fetch_delta_positions", "_fetch_hyperliquid_positions")
+
+def _position(symbol="BTC/USDT", mark_price=110.0) -> NormalizedPosition:
+    return NormalizedPosition(venue="binance", symbol=symbol, side="long", size=1.0,
+                              entry_price=100.0, mark_price=mark_price,
+                              unrealized_pnl=mark_price - 100.0, leverage=2.0)
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(portfolio_state.time, "monotonic", fake)
+    return fake
+
+@pytest.fixture
+async def agent():
+    agent = PortfolioStateAgent("sqlite+aiosqlite:///:memory:")
+    await agent.init_db()
+    yield agent
+    await agent.aclose()
+
+class Venue:
+    """Fetch stub: returns `positions`, or raises while `fail` is set; counts calls."""
+    def __init__(self, positions):
+        self.positions = positions
+        self.fail = False
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("venue down")
+        return self.positions
+
+async def test_failed_venue_serves_last_good_positions(agent, clock):
+    venue = Venue([_position()])
+    assert await agent._run_venue("binance", venue) == venue.positions
+    
+    venue.fail = True
+    assert await agent._run_venue("binance", venue) == venue.positions
+
+async def test_cooldown_skips_venue_after_threshold(agent, clock):
+    venue = Venue([_position()])
+    await agent._run_venue("binance", venue)
+    venue.fail = True
+    for _ in range(VENUE_FAILURE_THRESHOLD):
+        await agent._run_venue("binance", venue)
+    calls = venue.calls
+    
+    # Inside the cooldown the venue isn't called at all
+    clock.now += VENUE_COOLDOWN_SECONDS - 1
+    assert await agent._run_venue("binance", venue) == venue.positions
+    assert venue.calls == calls
+    
+    # After it, the venue is tried again
+    clock.now += 2
+    venue.fail = False
+    await agent._run_venue("binance", venue)
+    assert venue.calls == calls + 1
+
+async def test_last_good_positions_expire(agent, clock):
+    venue = Venue([_position()])
+    await agent._run_venue("binance", venue)
+    venue.fail = True
+    
+    clock.now += VENUE_STALE_MAX_AGE_SECONDS + 1
+    assert await agent._run_venue("binance", venue) == []
+
+async def test_unknown_venue_failure_contributes_nothing(agent, clock):
+    venue = Venue([])
+    venue.fail = True
+    assert await agent._run_venue("okx", venue) == []
+
+async def test_unchanged_state_is_not_persisted_twice(agent):
+    positions = [_position()]
+    async def fetch():
+        return positions
+    async def empty():
+        return []
+    for name in VENUES:
+        setattr(agent, name, empty)
+    agent._fetch_binance_positions = fetch
+    
+    first = await agent.fetch_snapshot(refresh=True)
+    second = await agent.fetch_snapshot(refresh=True)
+    assert second.id == first.id
+    assert second is not first # Re-observed copy; the persisted object isn't mutated
+    assert second.as_of >= first.as_of
+    assert second.timestamp == first.timestamp
+    assert len(await agent.load_equity_history(10)) == 1
+    
+    positions[:] = [_position(mark_price=120.0)]
+    third = await agent.fetch_snapshot(refresh=True)
+    assert third.id != first.id
+    assert len(await agent.load_equity_history(10)) == 2